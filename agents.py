@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import os
 import re
-from typing import Dict, Any, List
-from collections import defaultdict
+from typing import Callable, Dict, Any, List
 import datetime as dt
-import pytz
+
+import numpy as np
+from langgraph.config import get_stream_writer
 
 from scraper import arabic_search, fetch_and_extract_prices
 from prompts import build_report_prompt
@@ -31,45 +34,51 @@ def _likely_irrelevant(url: str) -> bool:
     return any(s in u for s in BAD_SUBSTRINGS)
 
 
-def _is_today(hint: str | None) -> bool:
+_ISO_DATE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+_DMY_DATE = re.compile(r"^(\d{1,2})[-/](\d{1,2})[-/](20\d{2})$")
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_hint_date(hint: str) -> dt.date | None:
     """
-    Accepts 'اليوم' or simple dates:
+    Parses simple date hints (memoized; the same hint recurs across prices):
       - 2025-10-20
       - 20-10-2025
       - 20/10/2025
-    Compares against Africa/Cairo 'today'.
+    Returns None if the hint is not one of these or not a valid date.
     """
-    if not hint:
-        return False
-    if hint.strip() == "اليوم":
-        return True
-
-    m = re.match(r"^(\d{4})-(\d{2})-(\d{2})$", hint) or re.match(
-        r"^(\d{1,2})[-/](\d{1,2})[-/](20\d{2})$", hint
-    )
+    m = _ISO_DATE.match(hint) or _DMY_DATE.match(hint)
     if not m:
-        return False
+        return None
 
     try:
         # ISO form
-        if len(m.groups()) == 3 and len(m.group(1)) == 4:
+        if len(m.group(1)) == 4:
             y, mo, d = int(m.group(1)), int(m.group(2)), int(m.group(3))
         else:
             # dd-mm-yyyy or dd/mm/yyyy
             d, mo, y = int(m.group(1)), int(m.group(2)), int(m.group(3))
-        today = (
-            now_cairo().date()
-            if callable(now_cairo)
-            else dt.datetime.now(pytz.timezone("Africa/Cairo")).date()
-        )
-        return dt.date(y, mo, d) == today
-    except Exception:
+        return dt.date(y, mo, d)
+    except ValueError:
+        return None
+
+
+def _is_today(hint: str | None, today: dt.date) -> bool:
+    """Accepts 'اليوم' or a date hint equal to `today` (Africa/Cairo)."""
+    if not hint:
         return False
+    if hint.strip() == "اليوم":
+        return True
+    return _parse_hint_date(hint) == today
 
 
-def _llm_call(system: str, user: str) -> str:
+def _llm_call(
+    system: str, user: str, on_chunk: Callable[[str], None] | None = None
+) -> str:
     """
     Minimal Groq LLM wrapper. If you already had one, feel free to keep yours.
+    Streams the response; `on_chunk` (if given) receives each text piece as it
+    arrives, and the full text is returned at the end.
     """
     if ChatGroq is None:
         return "تعذّر استدعاء نموذج اللغة (ChatGroq غير متوفر)."
@@ -85,12 +94,26 @@ def _llm_call(system: str, user: str) -> str:
         {"role": "user", "content": user},
     ]
     try:
-        resp = llm.invoke(msgs)
-        return resp.content if hasattr(resp, "content") else str(resp)
+        parts: List[str] = []
+        for chunk in llm.stream(msgs):
+            text = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if text:
+                parts.append(text)
+                if on_chunk:
+                    on_chunk(text)
+        return "".join(parts)
     except Exception as e:
         return f"حدث خطأ أثناء توليد التقرير: {e}"
 
 
+_KARATS = (18, 21, 24)
+
+
+def _min_max_count(arr: np.ndarray) -> Dict[str, float]:
+    # Plain Python numbers so the graph state stays JSON/pickle friendly
+    return {"min": float(arr.min()), "max": float(arr.max()), "count": int(arr.size)}
+
+
 # ---------------------------
 # Agents
 # ---------------------------
@@ -122,7 +145,7 @@ def fetch_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     Also computes split stats for 21k with/without making charge.
     """
     links = state.get("links", [])
-    pages, prices = fetch_and_extract_prices(links)
+    pages, prices = asyncio.run(fetch_and_extract_prices(links))
 
     # Egypt filters (EGP + sensible numeric range)
     region = state.get("region") or os.getenv("DEFAULT_REGION", "EG")
@@ -131,56 +154,42 @@ def fetch_agent(state: Dict[str, Any]) -> Dict[str, Any]:
         prices = [
             p
             for p in prices
-            if any(a in (p.get("currency") or "") for a in egp_aliases)
+            if any(a in (p.currency or "") for a in egp_aliases)
         ]
         MIN_EGP, MAX_EGP = 500.0, 20000.0
         prices = [
             p
             for p in prices
-            if isinstance(p.get("price"), (int, float))
-            and MIN_EGP <= p["price"] <= MAX_EGP
+            if isinstance(p.price, (int, float)) and MIN_EGP <= p.price <= MAX_EGP
         ]
 
     # Prefer today's prices when available (based on published_hint from scraper)
-    today_prices = [p for p in prices if _is_today(p.get("published_hint"))]
+    today = now_cairo().date()  # once per run, not per price
+    today_prices = [p for p in prices if _is_today(p.published_hint, today)]
     if today_prices:
         prices = today_prices
 
-    # Overall per-karat stats
-    by_k = defaultdict(list)
-    for p in prices:
-        k = p.get("karat")
-        pr = p.get("price")
-        if k in (18, 21, 24) and isinstance(pr, (int, float)):
-            by_k[k].append(float(pr))
-
-    stats = {}
-    for k, arr in by_k.items():
-        stats[k] = {"min": min(arr), "max": max(arr), "count": len(arr)}
-
-    # Split by making charge (مصنعية)
-    stats_wm = defaultdict(
-        lambda: {"min": float("inf"), "max": float("-inf"), "count": 0}
+    # Per-karat stats, overall and split by making charge (مصنعية), computed
+    # vectorized over one packed array instead of per-price Python updates
+    rows = np.array(
+        [
+            (p.karat, bool(p.with_making), p.price)
+            for p in prices
+            if p.karat in _KARATS and isinstance(p.price, (int, float))
+        ],
+        dtype=[("karat", "i1"), ("with_making", "?"), ("price", "f8")],
     )
-    for p in prices:
-        k = p.get("karat")
-        pr = p.get("price")
-        if k in (18, 21, 24) and isinstance(pr, (int, float)):
-            key = (k, bool(p.get("with_making")))
-            bucket = stats_wm[key]
-            bucket["min"] = min(bucket["min"], pr)
-            bucket["max"] = max(bucket["max"], pr)
-            bucket["count"] += 1
-
-    # Clean infinities and JSONify keys
-    for bucket in stats_wm.values():
-        if bucket["min"] == float("inf"):
-            bucket["min"] = 0
-        if bucket["max"] == float("-inf"):
-            bucket["max"] = 0
-    stats_wm = {
-        f"{k}:{'with' if w else 'without'}": v for (k, w), v in stats_wm.items()
-    }
+    stats = {}
+    stats_wm = {}
+    for k in _KARATS:
+        of_k = rows[rows["karat"] == k]
+        if not of_k.size:
+            continue
+        stats[k] = _min_max_count(of_k["price"])
+        for w in (False, True):
+            arr = of_k["price"][of_k["with_making"] == w]
+            if arr.size:
+                stats_wm[f"{k}:{'with' if w else 'without'}"] = _min_max_count(arr)
 
     return {
         **state,
@@ -204,5 +213,8 @@ def report_agent(state: Dict[str, Any]) -> Dict[str, Any]:
         timestamp=now_cairo().strftime("%Y-%m-%d %H:%M %Z"),
         stats=state.get("stats", {}),
     )
-    report = _llm_call(system, user)
+    # Forward tokens on the graph's "custom" stream so the UI can render
+    # the report progressively (see app.py).
+    writer = get_stream_writer()
+    report = _llm_call(system, user, on_chunk=lambda t: writer({"report_chunk": t}))
     return {**state, "region": region, "report": report}
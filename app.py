@@ -1,15 +1,27 @@
 from __future__ import annotations
 import streamlit as st
 from dotenv import load_dotenv
+from dataclasses import asdict
 from graph import build_graph
 
 # NEW: for CSV export
-import pandas as pd
+import csv
+import io
 
 load_dotenv()
 st.set_page_config(
     page_title="تقرير أسعار الذهب اليوم", page_icon="🏅", layout="centered"
 )
+
+
+# Compile the graph once per server process. Search/fetch results are not
+# cached here: scraper.py already caches them on disk per Cairo day and
+# skips caching empty results, so outages can be retried right away.
+@st.cache_resource
+def _graph():
+    return build_graph()
+
+
 st.title("🏅 تقرير أسعار الذهب في مصر")
 st.caption("يبحث تلقائيًا في الويب (عربي)، يستخلص الأسعار، ويولّد تقريرًا بالعربية")
 
@@ -24,7 +36,7 @@ ph_prices = st.empty()
 ph_report = st.empty()
 
 if run_btn:
-    app = build_graph()
+    app = _graph()
     state = {
         "query": query,
         "region": region,
@@ -36,8 +48,17 @@ if run_btn:
 
     with st.spinner("جارٍ تشغيل التحليل…"):
         saw_anything = False
+        report_so_far = ""
+
+        for mode, cur in app.stream(state, stream_mode=["values", "custom"]):
+            # ---------------- Report tokens (live) ----------------
+            if mode == "custom":
+                report_so_far += cur.get("report_chunk", "")
+                with ph_report.container():
+                    st.subheader("التقرير النهائي")
+                    st.markdown(report_so_far)
+                continue
 
-        for cur in app.stream(state, stream_mode="values"):
             # ---------------- Links ----------------
             if cur.get("links"):
                 saw_anything = True
@@ -53,7 +74,8 @@ if run_btn:
                     st.subheader("الأسعار المستخرجة (تجريبية)")
 
                     # Sort by karat if present (so 24/21/18 appear clearly)
-                    data = cur["prices"]
+                    # Price objects → plain dicts for the table/CSV widgets
+                    data = [asdict(p) for p in cur["prices"]]
                     try:
                         data = sorted(
                             data,
@@ -119,10 +141,15 @@ if run_btn:
 
                     # ---- NEW: CSV download for transparency ----
                     try:
-                        df = pd.DataFrame(data)
+                        buf = io.StringIO()
+                        # columns in first-seen order (same as the table above)
+                        fields = list(dict.fromkeys(k for row in data for k in row))
+                        writer = csv.DictWriter(buf, fieldnames=fields)
+                        writer.writeheader()
+                        writer.writerows(data)
                         st.download_button(
                             "تنزيل الأسعار كملف CSV",
-                            df.to_csv(index=False).encode("utf-8-sig"),
+                            buf.getvalue().encode("utf-8-sig"),
                             file_name="gold_prices_eg.csv",
                             mime="text/csv",
                         )
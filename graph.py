@@ -3,6 +3,7 @@ from typing import List, Dict, Any, TypedDict, Optional
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 from agents import search_agent, fetch_agent, report_agent
+from utils import Price
 
 
 class AppState(TypedDict):
@@ -10,7 +11,7 @@ class AppState(TypedDict):
     region: str
     links: List[str]
     pages: List[Dict[str, Any]]
-    prices: List[Dict[str, Any]]
+    prices: List[Price]
     report: Optional[str]
 
 
@@ -1,9 +1,14 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Tuple, Optional
+
+from utils import Price
+
+# Karat suffix for the extracted-rows block; other/unknown karats get none
+_KARAT_STR = {k: f" (عيار {k})" for k in (18, 21, 24)}
 
 
 def build_report_prompt(
-    prices: List[Dict[str, Any]],
+    prices: List[Price],
     links: List[str],
     region: str,
     timestamp: str,
@@ -29,23 +34,19 @@ def build_report_prompt(
     # ----------------------------
     # Helper: format one extracted row
     # ----------------------------
-    def fmt_price(p: Dict[str, Any]) -> str:
-        title = p.get("title") or ""
-        price = p.get("price", "")
-        curr = p.get("currency") or ""
-        karat = p.get("karat")
-        karat_part = f" (عيار {karat})" if karat in (18, 21, 24) else ""
-        site = p.get("site") or ""
-        return f"- {title}{karat_part} → {price} {curr}\n  ({site})"
+    def fmt_price(p: Price) -> str:
+        karat_part = _KARAT_STR.get(p.karat, "")
+        return (
+            f"- {p.title or ''}{karat_part} → {p.price} {p.currency or ''}\n"
+            f"  ({p.site or ''})"
+        )
 
     # ----------------------------
     # Blocks: links / extracts / stats
     # ----------------------------
-    price_lines = [fmt_price(p) for p in prices]
     extracted_block = (
-        "\n".join(price_lines)
-        if price_lines
-        else "لم يتم استخراج أسعار مؤكدة من الصفحات. الرجاء مراجعة الروابط أدناه."
+        "\n".join(fmt_price(p) for p in prices)
+        or "لم يتم استخراج أسعار مؤكدة من الصفحات. الرجاء مراجعة الروابط أدناه."
     )
 
     links_block = "\n".join(f"- {u}" for u in links) if links else "- لا توجد روابط."
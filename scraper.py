@@ -1,9 +1,12 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple, Iterable
+from typing import List, Dict, Any, Tuple, Iterator
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from ddgs import DDGS
-import requests
+import aiohttp
 from bs4 import BeautifulSoup
-from utils import normalize_number
+from diskcache import Cache
+from utils import Price, normalize_number, now_cairo
 from tenacity import retry, stop_after_attempt, wait_exponential
 import re
 
@@ -22,6 +25,18 @@ SOCIAL_BLOCK = (
     "tiktok.com",
 )
 
+_BLOCK_RE = re.compile("|".join(map(re.escape, SOCIAL_BLOCK)))
+
+# Search results and page HTML are cached on disk per (key, Cairo day), so
+# repeated runs on the same day skip DDG and the network entirely.
+_CACHE = Cache(".gold_cache")
+_CACHE_TTL = 6 * 60 * 60  # seconds
+
+
+def _cache_key(*parts: Any) -> Tuple[Any, ...]:
+    return (*parts, now_cairo().date().isoformat())
+
+
 # (Optional) we still filter noisy results later in agents.py; here we keep search permissive.
 
 _AR_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
@@ -31,56 +46,73 @@ def _to_western_digits(text: str) -> str:
     return text.translate(_AR_DIGITS)
 
 
-def _unique(seq: Iterable[str]) -> List[str]:
-    seen, out = set(), []
-    for x in seq:
-        if x not in seen:
-            seen.add(x)
-            out.append(x)
-    return out
-
-
 def arabic_search(query: str, region: str = "EG", max_results: int = 6) -> List[str]:
-    links: List[str] = []
+    key = _cache_key("search", query, region, max_results)
+    cached = _CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    seen: set[str] = set()
+    out: List[str] = []
     with DDGS() as ddgs:
         for q in [query] + AR_QUERIES:
             try:
                 for r in ddgs.text(q, region=region, max_results=max_results):
                     url = r.get("href") or r.get("link") or r.get("url")
-                    if not url:
+                    if not url or url in seen or _BLOCK_RE.search(url):
                         continue
-                    if any(bad in url for bad in SOCIAL_BLOCK):
-                        continue
-                    links.append(url)
-                    if len(_unique(links)) >= max_results:
+                    seen.add(url)
+                    out.append(url)
+                    if len(out) >= max_results:
                         break
             except Exception:
                 # swallow DDG hiccups and continue with next query
                 pass
-            if len(_unique(links)) >= max_results:
+            if len(out) >= max_results:
                 break
-    return _unique(links)[:max_results]
+    if out:  # don't pin an empty result from a DDG outage for hours
+        _CACHE.set(key, out, expire=_CACHE_TTL)
+    return out
+
 
+_CANDIDATE_SELECTOR = ".price, .gold, table, body"
 
-def _extract_candidates(soup: BeautifulSoup) -> List[str]:
-    texts: List[str] = []
-    for sel in (".price", ".gold", "table", "body"):
-        for el in soup.select(sel):
-            txt = el.get_text(" ", strip=True)
-            if txt:
-                texts.append(txt)
-    if not texts:
+
+def _candidate_rank(el) -> int:
+    """Position of the element's first matching selector in _CANDIDATE_SELECTOR."""
+    classes = el.get("class") or ()
+    if "price" in classes:
+        return 0
+    if "gold" in classes:
+        return 1
+    return 2 if el.name == "table" else 3
+
+
+def _extract_candidates(soup: BeautifulSoup) -> Iterator[str]:
+    """
+    Yield candidate snippets, most specific selectors first, skipping exact
+    duplicates (e.g. a lone `.price` table repeated as the whole body).
+    Lazy so callers can stop early without extracting the larger blocks' text.
+    """
+    seen: set[str] = set()
+    # One tree walk for all selectors; the stable sort restores selector
+    # priority while keeping document order within each selector.
+    for el in sorted(soup.select(_CANDIDATE_SELECTOR), key=_candidate_rank):
+        txt = el.get_text(" ", strip=True)
+        if txt and txt not in seen:
+            seen.add(txt)
+            # normalize Arabic digits to western for parsing
+            yield _to_western_digits(txt)
+    if not seen:
         body_txt = soup.get_text(" ", strip=True)
         if body_txt:
-            texts.append(body_txt[:3000])
-    # normalize Arabic digits to western for parsing
-    return [_to_western_digits(t) for t in texts]
+            yield _to_western_digits(body_txt[:3000])
 
 
 # === Patterns (EGP-only) ===
 # Only Egyptian pound notations
 _CURRENCY = r"(?:جنيه(?:\s*مصري)?|ج\.م|EGP)"
-_NUM = r"(\d[\d\.\,\s]*)"
+_NUM = r"(?P<price>\d[\d\.\,\s]*)"
 
 # price with currency (e.g., 3450 جنيه)
 PAT_PRICE_CURR = re.compile(rf"{_NUM}\s*{_CURRENCY}", re.IGNORECASE)
@@ -99,6 +131,27 @@ PAT_PRICE_THEN_KARAT = re.compile(
 )
 
 
+def _tagged(name: str, pat: re.Pattern) -> str:
+    """Wrap a pattern in a named group, prefixing its inner group names."""
+    return f"(?P<{name}>" + pat.pattern.replace("(?P<", f"(?P<{name}_") + ")"
+
+
+# All of the above as one alternation, so each snippet is scanned once.
+# Order matters: karat-aware alternatives win when several match at one spot.
+_PAT_ALL = re.compile(
+    "|".join(
+        _tagged(name, pat)
+        for name, pat in (
+            ("kp", PAT_KARAT_THEN_PRICE),
+            ("pk", PAT_PRICE_THEN_KARAT),
+            ("pc", PAT_PRICE_CURR),
+            ("pg", PAT_GRAM_21_24),
+        )
+    ),
+    re.IGNORECASE,
+)
+
+
 # === Helpers ===
 def _looks_like_year(x: float) -> bool:
     return 1900 <= x <= 2100 and float(x).is_integer()
@@ -111,16 +164,16 @@ def _has_gold_context(text: str) -> bool:
     return any(w in text for w in _GOLD_CONTEXT_WORDS)
 
 
-_DATE_PATS = [
-    r"\b(20\d{2}-\d{2}-\d{2})\b",  # 2025-10-20
-    r"\b(\d{1,2}/\d{1,2}/20\d{2})\b",  # 20/10/2025
-    r"\b(\d{1,2}-\d{1,2}-20\d{2})\b",  # 20-10-2025
+_DATE_RES = [
+    re.compile(r"\b(20\d{2}-\d{2}-\d{2})\b"),  # 2025-10-20
+    re.compile(r"\b(\d{1,2}/\d{1,2}/20\d{2})\b"),  # 20/10/2025
+    re.compile(r"\b(\d{1,2}-\d{1,2}-20\d{2})\b"),  # 20-10-2025
 ]
 
 
 def _maybe_find_date(text: str) -> str | None:
-    for pat in _DATE_PATS:
-        m = re.search(pat, text)
+    for pat in _DATE_RES:
+        m = pat.search(text)
         if m:
             return m.group(1)
     if "اليوم" in text:
@@ -135,47 +188,46 @@ def _heuristic_price_parse(text: str):
       - Guards against year-like numbers (e.g., 2024/2025).
       - For generic "<num> جنيه", requires gold context in the surrounding text.
     """
-    out = []
-
-    # 1) Prefer karat-specific matches
-    for m in PAT_KARAT_THEN_PRICE.finditer(text):
-        karat = int(m.group("karat"))
-        num = normalize_number(m.group("price"))
+    buckets: Dict[str, list] = {"kp": [], "pk": [], "pc": [], "pg": []}
+    gold_ctx: bool | None = None
+
+    pos = 0
+    while m := _PAT_ALL.search(text, pos):
+        kind = m.lastgroup  # the outer alternative that matched
+        # Resume right after the number, not after the whole match, so a
+        # trailing "عيار NN" can still start the next (karat-then-price) match.
+        pos = m.end(f"{kind}_price")
+        num = normalize_number(m.group(f"{kind}_price"))
         if num is None or _looks_like_year(num):
             continue  # ignore invalid or year-like numbers
-        out.append((num, "جنيه", karat))
 
-    for m in PAT_PRICE_THEN_KARAT.finditer(text):
-        karat = int(m.group("karat"))
-        num = normalize_number(m.group("price"))
-        if num is None or _looks_like_year(num):
-            continue
-        out.append((num, "جنيه", karat))
+        if kind in ("kp", "pk"):
+            buckets[kind].append((num, "جنيه", int(m.group(f"{kind}_karat"))))
+        elif kind == "pc":
+            # generic "<num> جنيه" requires gold context (checked once per text)
+            if gold_ctx is None:
+                gold_ctx = _has_gold_context(text)
+            if not gold_ctx:
+                continue
+            curr = m.group(0)[len(m.group("pc_price")) :].strip()
+            buckets["pc"].append((num, curr, None))
+        else:
+            # If the pattern mentions 21/24 implicitly, infer karat from match
+            karat = 21 if "21" in m.group(0) else (24 if "24" in m.group(0) else None)
+            buckets["pg"].append((num, "جنيه", karat))
 
+    # 1) Prefer karat-specific matches
+    out = buckets["kp"] + buckets["pk"]
     if out:
         return out  # List of tuples: (price, currency, karat)
 
     # 2) Fall back: number + currency (no karat), but require gold context
-    for m in PAT_PRICE_CURR.finditer(text):
-        if not _has_gold_context(text):
-            continue
-        num = normalize_number(m.group(1))
-        if num is None or _looks_like_year(num):
-            continue
-        curr = m.group(0)[len(m.group(1)) :].strip()
-        out.append((num, curr, None))
-
     # 3) Last resort: number near "جرام" (assume EGP)
-    if not out:
-        for m in PAT_GRAM_21_24.finditer(text):
-            num = normalize_number(m.group(1))
-            if num is None or _looks_like_year(num):
-                continue
-            # If the pattern mentions 21/24 implicitly, infer karat from match
-            karat = 21 if "21" in m.group(0) else (24 if "24" in m.group(0) else None)
-            out.append((num, "جنيه", karat))
+    return buckets["pc"] or buckets["pg"]
 
-    return out
+
+# Snippet score at which a karat-tagged match stops the candidate scan
+_GOOD_SCORE = 2
 
 
 def _score_snippet(snippet: str) -> int:
@@ -196,64 +248,131 @@ def _score_snippet(snippet: str) -> int:
     return score
 
 
+_TIMEOUT = aiohttp.ClientTimeout(total=12)
+# Price blocks sit well inside this; the tail is mostly scripts/ads
+_MAX_HTML_BYTES = 512 * 1024
+
+
 @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.5, max=2))
-def _get(url: str) -> str:
-    r = requests.get(url, headers=HEADERS, timeout=12)
-    r.raise_for_status()
-    r.encoding = r.apparent_encoding or r.encoding
-    return r.text
+async def _aget(session: aiohttp.ClientSession, url: str) -> Tuple[str, str | bytes]:
+    """
+    Returns (url, page). The page is `str` when the response header names a
+    usable charset, otherwise raw `bytes` so BeautifulSoup (UnicodeDammit)
+    can read `<meta charset>` / sniff it, e.g. windows-1256 Arabic sites.
+    """
+    key = _cache_key("html", url)
+    html = _CACHE.get(key)
+    if html is not None:
+        return url, html
+
+    async with session.get(url, headers=HEADERS, timeout=_TIMEOUT) as resp:
+        resp.raise_for_status()
+        # Stream the body and stop at the cap instead of downloading it all
+        buf = bytearray()
+        truncated = False
+        async for chunk in resp.content.iter_chunked(8192):
+            buf += chunk
+            if len(buf) >= _MAX_HTML_BYTES:
+                truncated = True
+                break
+        charset = resp.charset
 
+    if truncated:
+        # Cut after the last tag so no multi-byte character is split in two
+        # (a split one makes strict detection fall back to the wrong codec)
+        end = buf.rfind(b">")
+        if end > 0:
+            del buf[end + 1 :]
 
-def fetch_and_extract_prices(
+    html = bytes(buf)
+    if charset:
+        try:
+            html = html.decode(charset, errors="replace")
+        except LookupError:  # unknown charset label: let BeautifulSoup sniff
+            pass
+    _CACHE.set(key, html, expire=_CACHE_TTL)
+    return url, html
+
+
+async def _fetch_all(
+    links: List[str],
+) -> List[Tuple[str, str | bytes] | BaseException]:
+    """Issue all GETs concurrently; failures come back as exception objects."""
+    async with aiohttp.ClientSession() as session:
+        return await asyncio.gather(
+            *[_aget(session, u) for u in links], return_exceptions=True
+        )
+
+
+def _parse_one(
+    url: str, res: Tuple[str, str | bytes] | BaseException
+) -> Tuple[Dict[str, Any], Price | None]:
+    """Parse one fetched page into (page record, best price or None)."""
+    try:
+        if isinstance(res, BaseException):
+            raise res
+        _, html = res
+        soup = BeautifulSoup(html, "lxml")
+        title = soup.title.get_text(strip=True) if soup.title else url
+
+        best_pair = None
+        best_score = -1
+        best_text = ""
+
+        for txt in _extract_candidates(soup):
+            score = _score_snippet(txt)
+            pairs = _heuristic_price_parse(txt)
+            if pairs:
+                # take the first pair in the best-scoring snippet
+                if score > best_score:
+                    best_score = score
+                    best_pair = pairs[0]
+                    best_text = txt  # keep text for context flags
+                # A karat-tagged hit in a specific block is good enough;
+                # don't fall through to the (much larger) body text.
+                if pairs[0][2] is not None and score >= _GOOD_SCORE:
+                    break
+
+        page = {"url": url, "title": title, "ok": True}
+        if not best_pair:
+            return page, None
+
+        price_val, currency, karat = best_pair
+
+        # Flags derived from the best snippet's text
+        has_making = any(
+            w in best_text for w in ("مصنعية", "بالمصنعية", "شاملة المصنعية")
+        )
+        published_hint = _maybe_find_date(best_text)
+
+        return page, Price(
+            site=url,
+            title=title,
+            price=price_val,
+            currency=currency,
+            karat=karat,
+            with_making=has_making,
+            published_hint=published_hint,
+        )
+    except Exception as e:
+        return {"url": url, "ok": False, "error": str(e)}, None
+
+
+async def fetch_and_extract_prices(
     links: List[str],
-) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+) -> Tuple[List[Dict[str, Any]], List[Price]]:
     pages: List[Dict[str, Any]] = []
-    prices: List[Dict[str, Any]] = []
-
-    for url in links:
-        try:
-            html = _get(url)
-            soup = BeautifulSoup(html, "html.parser")
-            title = soup.title.get_text(strip=True) if soup.title else url
-
-            best_pair = None
-            best_score = -1
-            best_text = ""
-
-            candidates = _extract_candidates(soup)
-            for txt in candidates:
-                score = _score_snippet(txt)
-                pairs = _heuristic_price_parse(txt)
-                if pairs:
-                    # take the first pair in the best-scoring snippet
-                    if score > best_score:
-                        best_score = score
-                        best_pair = pairs[0]
-                        best_text = txt  # keep text for context flags
-
-            pages.append({"url": url, "title": title, "ok": True})
-            if best_pair:
-                price_val, currency, karat = best_pair
-
-                # Flags derived from the best snippet's text
-                has_making = any(
-                    w in best_text for w in ("مصنعية", "بالمصنعية", "شاملة المصنعية")
-                )
-                published_hint = _maybe_find_date(best_text)
-
-                prices.append(
-                    {
-                        "site": url,
-                        "title": title,
-                        "price": price_val,
-                        "currency": currency,  # EGP variants only, by pattern
-                        "karat": karat,  # 18/21/24 or None
-                        "unit": "جرام",  # clarity
-                        "with_making": has_making,
-                        "published_hint": published_hint,
-                    }
-                )
-        except Exception as e:
-            pages.append({"url": url, "ok": False, "error": str(e)})
+    prices: List[Price] = []
+    if not links:
+        return pages, prices
+
+    results = await _fetch_all(links)
+
+    # Parse all fetched pages in parallel; map() keeps link order
+    with ThreadPoolExecutor(max_workers=min(32, len(links))) as ex:
+        for page, price in ex.map(_parse_one, links, results):
+            pages.append(page)
+            if price:
+                prices.append(price)
 
     return pages, prices
@@ -1,14 +1,20 @@
 from __future__ import annotations
 from typing import Optional
 import re
+from dataclasses import dataclass
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 
 # Arabic-Indic digits → Western
 _ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
 
+# One-pass table: Arabic digits → Western, Arabic decimal '٫' → '.',
+# drop Arabic thousands '٬' and NBSP (other whitespace is split away after)
+_SEPARATORS = str.maketrans(
+    {**_ARABIC_DIGITS, 0x066B: ".", 0x066C: None, 0x00A0: None}
+)
+
 # Precompiled helpers
-_WS = re.compile(r"\s+")
 # Extract the first plausible numeric token (keeps digits, separators, and sign)
 _NUM_TOKEN = re.compile(r"[+-]?\d[\d\s.,\u066B\u066C]*")
 
@@ -23,11 +29,7 @@ def _standardize_separators(s: str) -> str:
     - Always drop Arabic thousands '٬' (U+066C).
     - Convert Arabic decimal '٫' (U+066B) to '.'.
     """
-    s = s.translate(_ARABIC_DIGITS)
-    s = s.replace("\xa0", " ")  # NBSP → space
-    s = s.replace("\u066b", ".")  # Arabic decimal → '.'
-    s = s.replace("\u066c", "")  # Arabic thousands → remove
-    s = _WS.sub("", s)  # remove all spaces
+    s = "".join(s.translate(_SEPARATORS).split())  # one pass + drop whitespace
 
     has_comma = "," in s
     has_dot = "." in s
@@ -78,5 +80,22 @@ def normalize_number(text: str) -> Optional[float]:
     return _to_float(token)
 
 
+CAIRO = ZoneInfo("Africa/Cairo")
+
+
 def now_cairo() -> datetime:
-    return datetime.now(pytz.timezone("Africa/Cairo"))
+    return datetime.now(CAIRO)
+
+
+@dataclass(slots=True)
+class Price:
+    """One extracted per-gram price (EGP variants only, by pattern)."""
+
+    site: str
+    title: str
+    price: float
+    currency: str
+    karat: Optional[int]  # 18/21/24 or None
+    unit: str = "جرام"  # clarity
+    with_making: bool = False
+    published_hint: Optional[str] = None